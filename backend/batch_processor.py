@@ -8,22 +8,33 @@ Usage:
 Features:
 - Process multiple (reddit_url, city, category) tuples
 - Send requests to /api/locations endpoint
-- Progress tracking with detailed output  
+- Concurrent requests (a few at a time) with progress tracking  
 - Error handling and retry logic
 - Final summary report
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 import time
 import sys
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
 from typing import List, Tuple, Dict, Any
 from datetime import datetime
 
 
 class BatchProcessor:
-    def __init__(self, api_base_url: str = "https://mommynature-production.up.railway.app"):
+    def __init__(self, api_base_url: str = "https://mommynature-production.up.railway.app", max_workers: int = 3):
         """Initialize batch processor"""
         self.api_base_url = api_base_url
+        self.max_workers = max_workers  # Requests in flight at once
+        
+        # Keep-alive session so each request reuses a pooled connection instead of a new TLS handshake
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
         self.locations_endpoint = f"{api_base_url}/api/locations"
         self.health_endpoint = f"{api_base_url}/health"
         
@@ -36,7 +47,7 @@ class BatchProcessor:
     def check_api_health(self) -> bool:
         """Check if the API server is running"""
         try:
-            response = requests.get(self.health_endpoint, timeout=5)
+            response = self.session.get(self.health_endpoint, timeout=5)
             if response.status_code == 200:
                 health_data = response.json()
                 print(f"✅ API server is healthy")
@@ -91,7 +102,7 @@ class BatchProcessor:
         
         try:
             # Send POST request
-            response = requests.post(
+            response = self.session.post(
                 self.locations_endpoint,
                 json=request_data,
                 timeout=120  # 2 minute timeout for processing
@@ -107,7 +118,7 @@ class BatchProcessor:
                 total_extracted = len(result_data.get('raw_locations', []))
                 cached = result_data.get('cached', False)
                 
-                print(f"   ✅ SUCCESS ({processing_time:.1f}s)")
+                print(f"   ✅ [{index}/{total}] SUCCESS ({processing_time:.1f}s)")
                 print(f"   📍 Extracted: {total_extracted} locations")
                 print(f"   ✅ Verified: {verified_count} locations") 
                 print(f"   💾 Cached: {'Yes' if cached else 'No'}")
@@ -131,7 +142,7 @@ class BatchProcessor:
                 except:
                     error_detail = response.text or f"HTTP {response.status_code}"
                 
-                print(f"   ❌ FAILED ({processing_time:.1f}s)")
+                print(f"   ❌ [{index}/{total}] FAILED ({processing_time:.1f}s)")
                 print(f"   Error: {error_detail}")
                 
                 return {
@@ -145,7 +156,7 @@ class BatchProcessor:
                 }
                 
         except requests.exceptions.Timeout:
-            print(f"   ⏰ TIMEOUT (>{120}s)")
+            print(f"   ⏰ [{index}/{total}] TIMEOUT (>{120}s)")
             return {
                 "status": "failed",
                 "reddit_url": reddit_url,
@@ -156,7 +167,7 @@ class BatchProcessor:
             }
             
         except requests.exceptions.RequestException as e:
-            print(f"   ❌ CONNECTION ERROR: {e}")
+            print(f"   ❌ [{index}/{total}] CONNECTION ERROR: {e}")
             return {
                 "status": "failed",
                 "reddit_url": reddit_url,
@@ -196,20 +207,23 @@ class BatchProcessor:
         self.results = []
         start_time = time.time()
         
-        for i, (reddit_url, city, category) in enumerate(batch_data, 1):
-            result = self.process_single_request(reddit_url, city, category, i, len(batch_data))
-            self.results.append(result)
-            
-            if result["status"] == "success":
-                self.total_successful += 1
-            else:
-                self.total_failed += 1
-            
-            self.total_processed += 1
+        # Each request mostly waits on GPT + Google Places server-side, so keep a few in flight
+        urls, cities, categories = zip(*batch_data)
+        indices = range(1, len(batch_data) + 1)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = executor.map(
+                self.process_single_request, urls, cities, categories, indices, repeat(len(batch_data))
+            )
             
-            # Small delay between requests to be nice to the API
-            if i < len(batch_data):
-                time.sleep(1)
+            for result in results:
+                self.results.append(result)
+                
+                if result["status"] == "success":
+                    self.total_successful += 1
+                else:
+                    self.total_failed += 1
+                
+                self.total_processed += 1
         
         # Generate summary report
         total_time = time.time() - start_time
@@ -242,19 +256,10 @@ class BatchProcessor:
         print(f"📍 Total locations cached: {total_locations}")
         
         # City/category breakdown
-        city_stats = {}
+        city_stats = defaultdict(Counter)
         for result in self.results:
             if result['status'] == 'success':
-                city = result['city']
-                category = result['category']
-                count = result.get('verified_count', 0)
-                
-                if city not in city_stats:
-                    city_stats[city] = {}
-                if category not in city_stats[city]:
-                    city_stats[city][category] = 0
-                
-                city_stats[city][category] += count
+                city_stats[result['city']][result['category']] += result.get('verified_count', 0)
         
         if city_stats:
             print(f"\n🏙️ Locations by city:")
@@ -56,24 +56,27 @@ class CacheManager:
                 print()
                 return
             
+            # Collect the report and write it in one go; large caches produce hundreds of lines
+            lines = []
+            
             # Overview
             overview = summary.get("overview", {})
-            print(f"🏙️  Cities: {overview.get('total_cities', 0)}")
-            print(f"📍 Total Locations: {overview.get('total_locations', 0)}")
-            print(f"✅ Verified: {overview.get('total_verified', 0)}")
-            print(f"📂 Categories: {overview.get('total_categories', 0)}")
-            print()
+            lines.append(f"🏙️  Cities: {overview.get('total_cities', 0)}")
+            lines.append(f"📍 Total Locations: {overview.get('total_locations', 0)}")
+            lines.append(f"✅ Verified: {overview.get('total_verified', 0)}")
+            lines.append(f"📂 Categories: {overview.get('total_categories', 0)}")
+            lines.append("")
             
             # Cache info
             cache_info = summary.get("cache_info", {})
-            print(f"📄 Cache File: {os.path.basename(cache_info.get('cache_file', 'unknown'))}")
-            print(f"🕐 Created: {self._format_timestamp(cache_info.get('created', 'unknown'))}")
-            print()
+            lines.append(f"📄 Cache File: {os.path.basename(cache_info.get('cache_file', 'unknown'))}")
+            lines.append(f"🕐 Created: {self._format_timestamp(cache_info.get('created', 'unknown'))}")
+            lines.append("")
             
             # Per-city breakdown
             cities = summary.get("cities", {})
             for city, city_data in cities.items():
-                print(f"🌆 {city} ({city_data['total_locations']} locations)")
+                lines.append(f"🌆 {city} ({city_data['total_locations']} locations)")
                 
                 categories = city_data.get("categories", {})
                 for category, cat_data in categories.items():
@@ -81,9 +84,11 @@ class CacheManager:
                     total = cat_data.get("location_count", 0)
                     last_updated = self._format_timestamp(cat_data.get("last_updated", "unknown"))
                     
-                    print(f"  └── {category}: {total} locations ({verified} verified)")
-                    print(f"      Last updated: {last_updated}")
-                print()
+                    lines.append(f"  └── {category}: {total} locations ({verified} verified)")
+                    lines.append(f"      Last updated: {last_updated}")
+                lines.append("")
+            
+            print("\n".join(lines))
                 
         except Exception as e:
             print(f"❌ Error retrieving cache summary: {e}")
@@ -1,18 +1,27 @@
 import requests
 import os
+from operator import itemgetter
 from typing import Dict, List, Optional
 from dotenv import load_dotenv
+from http_session import make_session
 import time
 
 load_dotenv()
 
+def make_places_session(pool_size: int = 8) -> requests.Session:
+    """Create a pooled Places session; searchText is a read-only POST, so POSTs are retried too"""
+    return make_session(pool_size=pool_size, retry_methods=frozenset({"GET", "POST"}))
+
 class GooglePlacesService:
-    def __init__(self):
+    def __init__(self, session: Optional[requests.Session] = None):
         self.api_key = os.getenv('GOOGLE_PLACES_API_KEY')
         if not self.api_key:
             print("Warning: GOOGLE_PLACES_API_KEY not found in .env file")
             self.api_key = None
         self.base_url = "https://places.googleapis.com/v1/places"
+        
+        # Reuse TLS connections across lookups instead of reconnecting per request
+        self.session = session or make_places_session()
     
     def search_place(self, location_name: str, location_type: str = None) -> Optional[Dict]:
         """Search for a place using Google Places API (New)"""
@@ -40,7 +49,7 @@ class GooglePlacesService:
                 "maxResultCount": 1
             }
             
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}:searchText",
                 headers=headers,
                 json=data
@@ -217,7 +226,7 @@ class GooglePlacesService:
             enhanced_locations.append(enhanced_location)
         
         # Re-sort by new combined score
-        enhanced_locations.sort(key=lambda x: x['score'], reverse=True)
+        enhanced_locations.sort(key=itemgetter('score'), reverse=True)
         
         return enhanced_locations
     
@@ -1,5 +1,6 @@
 import json
 import os
+import orjson
 from typing import Dict, List, Any
 from datetime import datetime
 
@@ -14,8 +15,8 @@ class GPTCacheService:
         """Load cache data from JSON file"""
         try:
             if os.path.exists(self.cache_file_path):
-                with open(self.cache_file_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                with open(self.cache_file_path, 'rb') as f:
+                    return orjson.loads(f.read())
             else:
                 return {
                     "cache_metadata": {
@@ -35,8 +36,11 @@ class GPTCacheService:
         """Save cache data to JSON file"""
         try:
             os.makedirs(os.path.dirname(self.cache_file_path), exist_ok=True)
-            with open(self.cache_file_path, 'w', encoding='utf-8') as f:
+            # Write to a temp file and swap it in so a crash mid-write can't truncate the cache
+            tmp_path = f"{self.cache_file_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
                 json.dump(self.cache_data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_file_path)
             return True
         except Exception as e:
             print(f"Error saving cache: {e}")
@@ -74,6 +78,9 @@ class GPTCacheService:
             # Add new locations
             category_data = self.cache_data["locations"][city][category]
             
+            # One timestamp for the whole batch
+            cached_at = datetime.now().isoformat()
+            
             for location in verified_locations:
                 # Create cache entry from verified location
                 cache_entry = {
@@ -81,7 +88,7 @@ class GPTCacheService:
                     "verified": location["verified"],
                     "city": city,
                     "category": category,
-                    "cached_at": datetime.now().isoformat(),
+                    "cached_at": cached_at,
                     "source_url": source_url
                 }
                 
@@ -101,7 +108,7 @@ class GPTCacheService:
                 category_data["locations"].append(cache_entry)
             
             # Update metadata
-            category_data["metadata"]["last_updated"] = datetime.now().isoformat()
+            category_data["metadata"]["last_updated"] = cached_at
             category_data["metadata"]["total_locations"] = len(category_data["locations"])
             if source_url:
                 category_data["metadata"]["source_url"] = source_url
@@ -2,12 +2,55 @@ import openai
 import os
 import json
 import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional
 from dotenv import load_dotenv
-from google_places import GooglePlacesService
+from google_places import GooglePlacesService, make_places_session
 
 load_dotenv()
 
+# Patterns compiled once at import rather than on every call
+_SUBREDDIT_RE = re.compile(r'/r/([^/]+)/')
+_JSON_ARRAY_RE = re.compile(r'\[(.*?)\]', re.DOTALL)
+_QUOTED_RE = re.compile(r'"([^"]+)"')
+_MOUNT_ABBREV_RE = re.compile(r'mt(?:\.|(?= ))')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Subreddit names that don't title-case into their city name
+SUBREDDIT_CITIES = {
+    'SanJose': 'San Jose',
+    'BayArea': 'Bay Area',
+    'SF': 'San Francisco',
+    'Oakland': 'Oakland',
+    'LosAngeles': 'Los Angeles',
+    'SanDiego': 'San Diego',
+    'Sacramento': 'Sacramento'
+}
+
+# What GPT should focus on for each supported category
+CATEGORY_INSTRUCTIONS = {
+    "viewpoints": "scenic overlooks, observation points, vista points, lookouts, scenic drives, mountain tops with views, bridges with views, and other places specifically known for their scenic views or panoramas",
+    "dog_parks": "off-leash dog areas, dog parks, fenced dog runs, dog beaches, dog-friendly parks, canine areas, and other locations specifically designed for or welcoming to dogs",
+    "hiking_spots": "hiking trails, trailheads, nature trails, walking paths, hiking destinations, mountain trails, forest paths, and other locations specifically for hiking or walking in nature"
+}
+
+# Generic area words GPT sometimes returns as if they were places
+LIKELY_JUNK_NAMES = frozenset(("downtown", "neighborhood", "area", "city", "county", "region"))
+
+_EXTRACTION_SYSTEM_MSG = {
+    "role": "system",
+    "content": "You are a location extraction expert. Extract only specific named places (parks, trails, mountains, viewpoints, beaches, etc.) from text. Return ONLY a JSON array of location names, nothing else."
+}
+
+# Google Places lookups are reused from disk for this long before being re-fetched
+PLACES_CACHE_TTL = 30 * 24 * 60 * 60  # 30 days
+
+# Concurrent Google Places lookups per verification pass
+PLACES_VERIFY_WORKERS = 4
+
 class GPTLocationExtractor:
     def __init__(self):
         self.api_key = os.getenv('OPENAI_API_KEY')
@@ -18,28 +61,81 @@ class GPTLocationExtractor:
             self.client = openai.OpenAI(api_key=self.api_key)
         
         # Initialize Google Places service for verification
-        self.places_service = GooglePlacesService()
+        self.places_service = GooglePlacesService(session=make_places_session(pool_size=PLACES_VERIFY_WORKERS * 2))
+        
+        # Persistent cache of Google Places lookups keyed by normalized search query
+        self.places_cache_file = os.path.join(os.path.dirname(__file__), 'gpt_cache', 'places_cache.json')
+        self._places_cache = self._load_places_cache()
+        self._places_cache_lock = threading.Lock()
+        self._places_cache_dirty = False
+        self._places_save_lock = threading.Lock()
+    
+    def _load_places_cache(self) -> Dict:
+        """Load cached Google Places lookups from disk, dropping entries older than PLACES_CACHE_TTL"""
+        try:
+            if os.path.exists(self.places_cache_file):
+                with open(self.places_cache_file, 'r', encoding='utf-8') as f:
+                    places_cache = json.load(f)
+                cutoff = time.time() - PLACES_CACHE_TTL
+                return {key: entry for key, entry in places_cache.items() if entry['ts'] >= cutoff}
+        except Exception as e:
+            print(f"Error loading places cache: {e}")
+        return {}
+    
+    def _save_places_cache(self) -> None:
+        """Write cached Google Places lookups to disk if any were added"""
+        # Concurrent requests share this extractor; saves run one at a time so a newer
+        # snapshot is never replaced by an older one
+        with self._places_save_lock:
+            with self._places_cache_lock:
+                if not self._places_cache_dirty:
+                    return
+                snapshot = dict(self._places_cache)
+                self._places_cache_dirty = False
+            
+            tmp_path = None
+            try:
+                cache_dir = os.path.dirname(self.places_cache_file)
+                os.makedirs(cache_dir, exist_ok=True)
+                # Write to a unique temp file and swap it in so a crash mid-write can't truncate the cache
+                with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=cache_dir, prefix='places_cache.json.', suffix='.tmp', delete=False) as f:
+                    tmp_path = f.name
+                    json.dump(snapshot, f, ensure_ascii=False)
+                os.replace(tmp_path, self.places_cache_file)
+            except Exception as e:
+                print(f"Error saving places cache: {e}")
+                with self._places_cache_lock:
+                    self._places_cache_dirty = True
+                if tmp_path and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+    
+    def _cached_search_place(self, search_query: str) -> Optional[Dict]:
+        """Search Google Places, reusing a cached result younger than PLACES_CACHE_TTL"""
+        cache_key = self._normalize_location_name(search_query)
+        entry = self._places_cache.get(cache_key)
+        if entry and time.time() - entry['ts'] < PLACES_CACHE_TTL:
+            return entry['data']
+        
+        google_data = self.places_service.search_place(search_query)
+        
+        # Only cache hits - a miss may just be a rate limit or transient API error
+        if google_data:
+            with self._places_cache_lock:
+                self._places_cache[cache_key] = {'data': google_data, 'ts': time.time()}
+                self._places_cache_dirty = True
+        
+        return google_data
     
     def extract_city_from_url(self, reddit_url: str) -> Optional[str]:
         """Extract city name from Reddit URL (e.g., r/SanJose -> San Jose)"""
         try:
             # Match pattern like /r/CityName/ or /r/BayArea/
-            match = re.search(r'/r/([^/]+)/', reddit_url)
+            match = _SUBREDDIT_RE.search(reddit_url)
             if match:
                 subreddit = match.group(1)
                 
                 # Handle common subreddit patterns
-                city_mapping = {
-                    'SanJose': 'San Jose',
-                    'BayArea': 'Bay Area',
-                    'SF': 'San Francisco',
-                    'Oakland': 'Oakland',
-                    'LosAngeles': 'Los Angeles',
-                    'SanDiego': 'San Diego',
-                    'Sacramento': 'Sacramento'
-                }
-                
-                return city_mapping.get(subreddit, subreddit.replace('_', ' ').title())
+                return SUBREDDIT_CITIES.get(subreddit, subreddit.replace('_', ' ').title())
             
             return None
         except:
@@ -78,10 +174,7 @@ class GPTLocationExtractor:
             response = self.client.chat.completions.create(
                 model="gpt-4o-mini",
                 messages=[
-                    {
-                        "role": "system", 
-                        "content": "You are a location extraction expert. Extract only specific named places (parks, trails, mountains, viewpoints, beaches, etc.) from text. Return ONLY a JSON array of location names, nothing else."
-                    },
+                    _EXTRACTION_SYSTEM_MSG,
                     {
                         "role": "user", 
                         "content": prompt
@@ -100,8 +193,12 @@ class GPTLocationExtractor:
             deduplicated = self._deduplicate_locations(raw_locations)
             print(f"🔄 After deduplication: {len(deduplicated)} unique locations")
             
-            # Step 5: Verify with Google Places API
-            verified_locations = self._verify_with_google_places(deduplicated, city)
+            # Step 5: Drop candidates that aren't worth a Places lookup
+            candidates = self._prefilter_candidates(deduplicated, city)
+            print(f"🧹 After pre-filtering: {len(candidates)} candidates to verify")
+            
+            # Step 6: Verify with Google Places API
+            verified_locations = self._verify_with_google_places(candidates, city)
             print(f"✅ Verified {len(verified_locations)} locations with Google Places")
             
             return {
@@ -146,13 +243,7 @@ class GPTLocationExtractor:
         combined_text = "\n\n".join(all_text_parts)
         
         # Build enhanced prompt with city and category context
-        category_instructions = {
-            "viewpoints": "scenic overlooks, observation points, vista points, lookouts, scenic drives, mountain tops with views, bridges with views, and other places specifically known for their scenic views or panoramas",
-            "dog_parks": "off-leash dog areas, dog parks, fenced dog runs, dog beaches, dog-friendly parks, canine areas, and other locations specifically designed for or welcoming to dogs",
-            "hiking_spots": "hiking trails, trailheads, nature trails, walking paths, hiking destinations, mountain trails, forest paths, and other locations specifically for hiking or walking in nature"
-        }
-        
-        category_focus = category_instructions.get(category, "outdoor locations")
+        category_focus = CATEGORY_INSTRUCTIONS.get(category, "outdoor locations")
         
         context_instruction = f"""
 IMPORTANT: This discussion is about {category.replace('_', ' ')} in/around {city}.
@@ -198,12 +289,11 @@ Reddit Discussion:
             # Fallback: try to extract array-like content
             try:
                 # Look for content between brackets
-                import re
-                match = re.search(r'\[(.*?)\]', response, re.DOTALL)
+                match = _JSON_ARRAY_RE.search(response)
                 if match:
                     array_content = match.group(1)
                     # Simple parsing of quoted strings
-                    locations = re.findall(r'"([^"]+)"', array_content)
+                    locations = _QUOTED_RE.findall(array_content)
                     return [loc.strip() for loc in locations if loc.strip()]
             except:
                 pass
@@ -216,83 +306,109 @@ Reddit Discussion:
         deduplicated = []
         
         for location in locations:
-            if not location or not location.strip():
+            location = location.strip() if location else ''
+            if not location:
                 continue
                 
-            # Normalize for comparison
-            normalized = self._normalize_location_name(location.strip())
+            # Normalize for comparison (already lowercased)
+            normalized = self._normalize_location_name(location)
             
-            if normalized.lower() not in seen:
-                seen.add(normalized.lower())
-                deduplicated.append(location.strip())
+            if normalized not in seen:
+                seen.add(normalized)
+                deduplicated.append(location)
         
         return deduplicated
     
+    def _prefilter_candidates(self, locations: List[str], city: Optional[str] = None) -> List[str]:
+        """Drop deduplicated names that would only waste a Google Places call"""
+        normalized_city = self._normalize_location_name(city) if city else None
+        kept = []
+        for location in locations:
+            normalized = self._normalize_location_name(location)
+            # The city itself and generic area words never resolve to a useful spot
+            if normalized == normalized_city or normalized in LIKELY_JUNK_NAMES:
+                continue
+            kept.append((location, normalized))
+        
+        # A name contained in a longer candidate (e.g. "Mission" in "Mission Peak") is covered by it
+        padded = [f" {normalized} " for _, normalized in kept]
+        return [
+            location for location, normalized in kept
+            if not any(f" {normalized} " in other and len(other) > len(normalized) + 2 for other in padded)
+        ]
+    
     def _normalize_location_name(self, location: str) -> str:
         """Normalize location name for deduplication"""
         # Convert to lowercase for comparison
         normalized = location.lower().strip()
         
-        # Handle common variations
-        normalized = normalized.replace('mt.', 'mount')
-        normalized = normalized.replace('mt ', 'mount ')
-        normalized = re.sub(r'\s+', ' ', normalized)  # Multiple spaces to single
+        # Handle common variations ("mt." / "mt " -> "mount"), then collapse multiple spaces to single
+        normalized = _MOUNT_ABBREV_RE.sub('mount', normalized)
+        normalized = _WHITESPACE_RE.sub(' ', normalized)
         
         return normalized
     
     def _verify_with_google_places(self, locations: List[str], city: Optional[str] = None) -> List[Dict]:
         """Verify locations using Google Places API"""
-        verified_locations = []
-        
         if not self.places_service.api_key:
             print("⚠️ Google Places API key not available - skipping verification")
             # Return unverified locations in expected format
             return [{"name": loc, "verified": False, "google_data": None} for loc in locations]
         
-        for location in locations:
-            print(f"🔍 Verifying: {location}")
+        # Lookups are independent network round-trips, so run a few at once (map keeps input order)
+        with ThreadPoolExecutor(max_workers=PLACES_VERIFY_WORKERS) as executor:
+            results = executor.map(lambda location: self._verify_location(location, city), locations)
+            verified = [result for result in results if result]
+        
+        # Persist new Places hits once per batch rather than on every hit
+        self._save_places_cache()
+        return verified
+    
+    def _verify_location(self, location: str, city: Optional[str] = None) -> Optional[Dict]:
+        """Verify a single location with Google Places, returning None if it can't be verified"""
+        print(f"🔍 Verifying: {location}")
+        
+        try:
+            # Build search query with city context
+            search_query = location
+            if city:
+                search_query = f"{location} {city}"
             
-            try:
-                # Build search query with city context
-                search_query = location
-                if city:
-                    search_query = f"{location} {city}"
-                
-                # Search Google Places
-                google_data = self.places_service.search_place(search_query)
-                
-                if google_data:
-                    # Convert photo_names to photo_urls
-                    photo_names = google_data.get('photo_names', [])
-                    photo_urls = self.places_service.get_photo_urls(photo_names) if photo_names else []
-                    
-                    verified_locations.append({
-                        "name": location,
-                        "verified": True,
-                        "google_data": {
-                            "canonical_name": google_data.get('name', location),
-                            "rating": google_data.get('rating'),
-                            "review_count": google_data.get('review_count', 0),
-                            "address": google_data.get('address', ''),
-                            "place_id": google_data.get('place_id', ''),
-                            "types": google_data.get('types', []),
-                            "photo_urls": photo_urls
-                        }
-                    })
-                    print(f"  ✅ Verified: {google_data.get('name', location)}")
-                else:
-                    print(f"  ❌ Not found in Google Places")
-                    # Optionally include unverified locations
-                    # verified_locations.append({
-                    #     "name": location,
-                    #     "verified": False,
-                    #     "google_data": None
-                    # })
+            # Search Google Places (served from the local cache when fresh)
+            google_data = self._cached_search_place(search_query)
+            
+            if google_data:
+                # Convert photo_names to photo_urls
+                photo_names = google_data.get('photo_names', [])
+                photo_urls = self.places_service.get_photo_urls(photo_names) if photo_names else []
                 
-            except Exception as e:
-                print(f"  ⚠️ Error verifying {location}: {e}")
+                print(f"  ✅ Verified: {google_data.get('name', location)}")
+                return {
+                    "name": location,
+                    "verified": True,
+                    "google_data": {
+                        "canonical_name": google_data.get('name', location),
+                        "rating": google_data.get('rating'),
+                        "review_count": google_data.get('review_count', 0),
+                        "address": google_data.get('address', ''),
+                        "place_id": google_data.get('place_id', ''),
+                        "types": google_data.get('types', []),
+                        "photo_urls": photo_urls
+                    }
+                }
+            
+            print(f"  ❌ Not found in Google Places: {location}")
+            # Optionally include unverified locations
+            # return {
+            #     "name": location,
+            #     "verified": False,
+            #     "google_data": None
+            # }
+            
+        except Exception as e:
+            print(f"  ⚠️ Error verifying {location}: {e}")
         
-        return verified_locations
+        return None
 
 # Example usage and testing
 if __name__ == "__main__":
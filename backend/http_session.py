@@ -0,0 +1,19 @@
+import requests
+from requests.adapters import HTTPAdapter
+from typing import FrozenSet
+from urllib3.util.retry import Retry
+
+def make_session(pool_size: int = 8, retry_methods: FrozenSet[str] = frozenset({"GET"})) -> requests.Session:
+    """Create a pooled HTTPS session that retries rate limits and server errors with backoff"""
+    retry = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=retry_methods,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    
+    session = requests.Session()
+    session.mount("https://", adapter)
+    return session
@@ -337,16 +337,17 @@ async def get_location_details(location_name: str, place_id: Optional[str] = Non
             raise HTTPException(status_code=404, detail=f"No locations found in cache")
         
         # Find location by name (case-insensitive)
+        location_key = location_name.lower()
         found_location = None
         for location in all_locations:
-            if location.get("name", "").lower() == location_name.lower():
+            if location.get("name", "").lower() == location_key:
                 found_location = location
                 break
         
         if not found_location:
             # Try partial match if exact match not found
             for location in all_locations:
-                if location_name.lower() in location.get("name", "").lower():
+                if location_key in location.get("name", "").lower():
                     found_location = location
                     break
         
@@ -418,6 +419,7 @@ async def get_weather_advice(location_name: str, request: WeatherRequest):
         location_name = location_name.replace("%20", " ").replace("+", " ").strip()
         
         # Get location data from cache first
+        location_key = location_name.lower()
         location_data = None
         if request.place_id:
             all_locations = cache_service.get_locations_by_place_id(request.place_id, request.category)
@@ -427,7 +429,7 @@ async def get_weather_advice(location_name: str, request: WeatherRequest):
         # Find the specific location
         if all_locations:
             for location in all_locations:
-                if location.get("name", "").lower() == location_name.lower():
+                if location.get("name", "").lower() == location_key:
                     location_data = location
                     break
         
@@ -456,7 +458,7 @@ async def get_weather_advice(location_name: str, request: WeatherRequest):
                 city_locations = cache_service.get_locations(city_data['name'], request.category)
                 if city_locations:
                     for loc in city_locations:
-                        if loc.get('name', '').lower() == location_name.lower():
+                        if loc.get('name', '').lower() == location_key:
                             city_name = city_data['name']
                             break
                     if city_name:
@@ -1,14 +1,25 @@
 #!/usr/bin/env python3
 """
 Migration script to transfer data from JSON cache to Vercel KV
+
+Usage:
+    python3 migrate_to_kv.py [--full-verify]
+
+Options:
+    --full-verify: Verify with a full KV summary (downloads every location) instead of key counts
 """
-import json
+import argparse
 import os
+import sys
 from datetime import datetime
 from gpt_cache_service import GPTCacheService
-from vercel_kv_cache_service import VercelKVCacheService
+from vercel_kv_cache_service import CACHE_VERSION, VercelKVCacheService, encode_location_list, encode_payload
+
+def _quick_verify(kv_cache):
+    """Return (total keys, location keys) in KV without downloading any values"""
+    return kv_cache.redis.dbsize(), kv_cache.count_keys("locations:*:*")
 
-def migrate_json_to_kv():
+def migrate_json_to_kv(full_verify: bool = False):
     """Migrate all data from JSON cache to Vercel KV"""
     print("🔄 Starting migration from JSON to Vercel KV...")
     
@@ -16,6 +27,8 @@ def migrate_json_to_kv():
         # Initialize both services
         json_cache = GPTCacheService()
         kv_cache = VercelKVCacheService()
+        assert hasattr(json_cache, 'cache_data'), "GPTCacheService missing cache_data"
+        cache_data = json_cache.cache_data
         
         # Get summary of JSON cache
         json_summary = json_cache.get_detailed_summary()
@@ -30,37 +43,41 @@ def migrate_json_to_kv():
         
         # Migrate place_id index
         print("\n🗂️ Migrating place_id index...")
-        if hasattr(json_cache, 'cache_data') and 'place_id_index' in json_cache.cache_data:
-            place_id_index = json_cache.cache_data['place_id_index']
-            # Set the place_id index directly in KV
-            kv_cache.redis.set("place_id_index", json.dumps(place_id_index))
+        if 'place_id_index' in cache_data:
+            place_id_index = cache_data['place_id_index']
+            # Store the place_id index as a KV hash (place_id -> city)
+            if place_id_index:
+                kv_cache.redis.hset("place_id_index", values=place_id_index)
             print(f"   Migrated {len(place_id_index)} place_id mappings")
         
         # Migrate cache metadata
         print("\n📋 Migrating cache metadata...")
-        if hasattr(json_cache, 'cache_data') and 'cache_metadata' in json_cache.cache_data:
-            metadata = json_cache.cache_data['cache_metadata'].copy()
+        if 'cache_metadata' in cache_data:
+            metadata = cache_data['cache_metadata'].copy()
+            metadata['version'] = CACHE_VERSION
             metadata['migrated_to_kv'] = datetime.now().isoformat()
             metadata['original_storage'] = 'JSON file'
             metadata['new_storage'] = 'Vercel KV (Upstash Redis)'
-            kv_cache.redis.set("cache_metadata", json.dumps(metadata))
+            kv_cache.redis.set("cache_metadata", encode_payload(metadata))
             print("   Cache metadata migrated")
         
         # Migrate cities and locations
         migrated_cities = 0
         migrated_locations = 0
+        merged_duplicates = 0
+        migrated_keys = 0
         
         for city_name, city_info in json_summary['cities'].items():
             print(f"\n🏙️ Migrating city: {city_name}")
             
             # Get city metadata from JSON cache
-            if hasattr(json_cache, 'cache_data') and city_name in json_cache.cache_data.get('locations', {}):
-                city_data = json_cache.cache_data['locations'][city_name]
+            if city_name in cache_data.get('locations', {}):
+                city_data = cache_data['locations'][city_name]
                 
                 # Migrate city metadata
                 if 'city_metadata' in city_data:
                     city_metadata = city_data['city_metadata']
-                    kv_cache.redis.set(f"city_metadata:{city_name}", json.dumps(city_metadata))
+                    kv_cache.redis.set(f"city_metadata:{city_name}", encode_payload(city_metadata))
                     print(f"   City metadata: ✅")
                 
                 # Migrate each category
@@ -75,17 +92,27 @@ def migrate_json_to_kv():
                         locations = category_data.get('locations', [])
                         
                         if locations:
-                            # Store locations in KV
+                            # Store locations in KV as a hash of location field -> entry
+                            # (repeated names collapse to their first entry)
                             locations_key = f"locations:{city_name}:{category}"
-                            kv_cache.redis.set(locations_key, json.dumps(locations))
+                            location_fields = encode_location_list(locations)
+                            kv_cache.redis.hset(locations_key, values=location_fields)
+                            kv_cache.redis.sadd("cities", city_name)
+                            kv_cache.redis.sadd(f"categories:{city_name}", category)
                             
                             # Store category metadata
                             if 'metadata' in category_data:
                                 metadata_key = f"metadata:{city_name}:{category}"
-                                kv_cache.redis.set(metadata_key, json.dumps(category_data['metadata']))
+                                category_metadata = {**category_data['metadata'], 'total_locations': len(location_fields)}
+                                kv_cache.redis.set(metadata_key, encode_payload(category_metadata))
                             
-                            migrated_locations += len(locations)
-                            print(f"     ✅ {len(locations)} locations migrated")
+                            duplicates = len(locations) - len(location_fields)
+                            migrated_locations += len(location_fields)
+                            merged_duplicates += duplicates
+                            migrated_keys += 1
+                            print(f"     ✅ {len(location_fields)} locations migrated")
+                            if duplicates:
+                                print(f"     🔁 {duplicates} repeated names merged")
                         else:
                             print(f"     ⚠️ No locations found")
             
@@ -95,24 +122,40 @@ def migrate_json_to_kv():
         print(f"\n✅ Migration completed!")
         print(f"   Cities migrated: {migrated_cities}")
         print(f"   Locations migrated: {migrated_locations}")
+        if merged_duplicates:
+            print(f"   Repeated names merged: {merged_duplicates}")
         
-        # Get KV cache summary to verify
-        print(f"\n📊 Verifying KV Cache...")
-        kv_summary = kv_cache.get_detailed_summary()
-        print(f"   KV Total cities: {kv_summary['overview']['total_cities']}")
-        print(f"   KV Total locations: {kv_summary['overview']['total_locations']}")
-        print(f"   KV Total verified: {kv_summary['overview']['total_verified']}")
-        
-        # Compare counts
-        json_total = json_summary['overview']['total_locations']
-        kv_total = kv_summary['overview']['total_locations']
-        
-        if json_total == kv_total:
-            print(f"\n🎉 SUCCESS: All {json_total} locations migrated successfully!")
+        if full_verify:
+            # Get KV cache summary to verify
+            print(f"\n📊 Verifying KV Cache...")
+            kv_summary = kv_cache.get_detailed_summary()
+            print(f"   KV Total cities: {kv_summary['overview']['total_cities']}")
+            print(f"   KV Total locations: {kv_summary['overview']['total_locations']}")
+            print(f"   KV Total verified: {kv_summary['overview']['total_verified']}")
+            
+            # Compare counts (the JSON total includes repeated names, which KV stores once)
+            json_total = json_summary['overview']['total_locations']
+            kv_total = kv_summary['overview']['total_locations']
+            
+            if json_total - merged_duplicates == kv_total:
+                print(f"\n🎉 SUCCESS: All {kv_total} locations migrated successfully!")
+            else:
+                print(f"\n⚠️ WARNING: Location count mismatch!")
+                print(f"   JSON cache had: {json_total} locations ({merged_duplicates} repeated names merged)")
+                print(f"   KV cache has: {kv_total} locations")
         else:
-            print(f"\n⚠️ WARNING: Location count mismatch!")
-            print(f"   JSON cache had: {json_total} locations")
-            print(f"   KV cache has: {kv_total} locations")
+            # Count keys only - run with --full-verify to compare location totals
+            print(f"\n📊 Verifying KV Cache (key counts)...")
+            total_keys, kv_location_keys = _quick_verify(kv_cache)
+            print(f"   KV Total keys: {total_keys}")
+            print(f"   KV Location keys: {kv_location_keys}")
+            
+            if kv_location_keys == migrated_keys:
+                print(f"\n🎉 SUCCESS: All {migrated_keys} city/category keys migrated successfully!")
+            else:
+                print(f"\n⚠️ WARNING: Location key count mismatch!")
+                print(f"   Keys written: {migrated_keys}")
+                print(f"   KV cache has: {kv_location_keys}")
             
         return True
         
@@ -136,6 +179,14 @@ def test_kv_connection():
         return False
 
 def main():
+    parser = argparse.ArgumentParser(description="Migrate the JSON location cache to Vercel KV")
+    parser.add_argument("--full-verify", action="store_true",
+                       help="Verify with a full KV summary instead of key counts")
+    args = parser.parse_args()
+    
+    # Emoji progress output must not crash the migration on non-UTF-8 consoles
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+    
     print("🚀 MommyNature JSON to Vercel KV Migration")
     print("=" * 50)
     
@@ -158,7 +209,7 @@ def main():
         return
     
     # Run migration
-    if migrate_json_to_kv():
+    if migrate_json_to_kv(full_verify=args.full_verify):
         print("\n🎉 Migration completed successfully!")
         print("\nNext steps:")
         print("1. Update your main.py to use VercelKVCacheService")
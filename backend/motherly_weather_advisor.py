@@ -6,6 +6,37 @@ from datetime import datetime
 
 load_dotenv()
 
+# Motherly advice prompt, filled in per call with str.format
+_PROMPT_TMPL = """You are a caring, experienced mom giving weather and clothing advice to someone visiting a nature location. 
+
+Write a warm, practical, and nurturing 2-3 sentence weather advisory. Your tone should be:
+- Motherly and caring (like talking to your own child)
+- Practical with specific clothing recommendations
+- Consider the outdoor activity type
+- Include gentle reminders about safety/comfort
+- Enthusiastic but realistic about conditions
+
+Weather Information:
+
+Location: {location_name} ({location_type})
+Visit Date: {formatted_date}
+Temperature: {temp}°F (High: {high_temp}°F, Low: {low_temp}°F)
+Conditions: {description}
+Main Weather: {main_condition}
+Humidity: {humidity}%
+Wind Speed: {wind_speed} mph
+
+
+Write advice that sounds like a loving mom who wants her child to be comfortable and safe on their outdoor adventure. Start with something like "Oh honey," or "Sweetie," and include specific clothing suggestions based on the weather."""
+
+_SYSTEM_MSG = {"role": "system", "content": "You are a caring, nurturing mom who gives excellent outdoor weather advice."}
+
+# Fallback advice used when GPT is not available, bucketed by temperature
+_WARM_TEMPLATE = "Oh honey, it looks like it'll be a warm {temp}°F for your visit to {name}! I'd recommend light, breathable clothing, a sun hat, and plenty of water. Don't forget the sunscreen - mama's orders! ☀️"
+_MILD_TEMPLATE = "Perfect weather at {temp}°F for {name}, sweetie! I'd pack a light jacket just in case, comfortable walking shoes, and maybe a small backpack with snacks and water. You're going to have such a lovely time! 🌤️"
+_CHILLY_TEMPLATE = "It'll be a bit chilly at {temp}°F, honey! Bundle up with layers you can adjust, a warm jacket, and don't forget gloves and a cozy hat. {name} will be beautiful, just stay warm out there! 🧥"
+_NO_TEMP_TEMPLATE = "I can't get the exact weather right now, but for any trip to {name}, I always say: dress in layers, bring water, wear good shoes, and check the forecast before you go. Have a wonderful and safe adventure, sweetie! 💕"
+
 class MotherlyWeatherAdvisor:
     def __init__(self):
         self.api_key = os.getenv('OPENAI_API_KEY')
@@ -51,37 +82,25 @@ class MotherlyWeatherAdvisor:
         except:
             formatted_date = visit_date
         
-        # Build context for the AI prompt
-        weather_context = f"""
-Location: {location_name} ({location_type})
-Visit Date: {formatted_date}
-Temperature: {temp}°F (High: {high_temp}°F, Low: {low_temp}°F)
-Conditions: {description}
-Main Weather: {main_condition}
-Humidity: {humidity}%
-Wind Speed: {wind_speed} mph
-"""
-        
         # Create the motherly advice prompt
-        prompt = f"""You are a caring, experienced mom giving weather and clothing advice to someone visiting a nature location. 
-
-Write a warm, practical, and nurturing 2-3 sentence weather advisory. Your tone should be:
-- Motherly and caring (like talking to your own child)
-- Practical with specific clothing recommendations
-- Consider the outdoor activity type
-- Include gentle reminders about safety/comfort
-- Enthusiastic but realistic about conditions
-
-Weather Information:
-{weather_context}
-
-Write advice that sounds like a loving mom who wants her child to be comfortable and safe on their outdoor adventure. Start with something like "Oh honey," or "Sweetie," and include specific clothing suggestions based on the weather."""
+        prompt = _PROMPT_TMPL.format(
+            location_name=location_name,
+            location_type=location_type,
+            formatted_date=formatted_date,
+            temp=temp,
+            high_temp=high_temp,
+            low_temp=low_temp,
+            description=description,
+            main_condition=main_condition,
+            humidity=humidity,
+            wind_speed=wind_speed
+        )
 
         try:
             response = self.client.chat.completions.create(
                 model="gpt-4o-mini",
                 messages=[
-                    {"role": "system", "content": "You are a caring, nurturing mom who gives excellent outdoor weather advice."},
+                    _SYSTEM_MSG,
                     {"role": "user", "content": prompt}
                 ],
                 max_tokens=200,
@@ -139,15 +158,16 @@ Write advice that sounds like a loving mom who wants her child to be comfortable
         location_name = location_data.get('name', 'your outdoor destination')
         temp = weather_data.get('temperature') or weather_data.get('avg_temp')
         
-        if temp:
-            if temp >= 75:
-                return f"Oh honey, it looks like it'll be a warm {temp}°F for your visit to {location_name}! I'd recommend light, breathable clothing, a sun hat, and plenty of water. Don't forget the sunscreen - mama's orders! ☀️"
-            elif temp >= 60:
-                return f"Perfect weather at {temp}°F for {location_name}, sweetie! I'd pack a light jacket just in case, comfortable walking shoes, and maybe a small backpack with snacks and water. You're going to have such a lovely time! 🌤️"
-            else:
-                return f"It'll be a bit chilly at {temp}°F, honey! Bundle up with layers you can adjust, a warm jacket, and don't forget gloves and a cozy hat. {location_name} will be beautiful, just stay warm out there! 🧥"
+        if not temp:
+            return _NO_TEMP_TEMPLATE.format(name=location_name)
+        
+        if temp >= 75:
+            template = _WARM_TEMPLATE
+        elif temp >= 60:
+            template = _MILD_TEMPLATE
         else:
-            return f"I can't get the exact weather right now, but for any trip to {location_name}, I always say: dress in layers, bring water, wear good shoes, and check the forecast before you go. Have a wonderful and safe adventure, sweetie! 💕"
+            template = _CHILLY_TEMPLATE
+        return template.format(temp=temp, name=location_name)
 
 # Example usage and testing
 if __name__ == "__main__":
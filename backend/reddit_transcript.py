@@ -1,6 +1,8 @@
+import heapq
 import praw
-import re
 import os
+from itertools import takewhile
+from operator import itemgetter
 from typing import Dict, List, Optional
 from dotenv import load_dotenv
 
@@ -17,8 +19,13 @@ class RedditTranscriptService:
     
     def extract_submission_id(self, reddit_url: str) -> Optional[str]:
         """Extract submission ID from Reddit URL"""
-        match = re.search(r'/comments/([a-zA-Z0-9]+)', reddit_url)
-        return match.group(1) if match else None
+        _, found, rest = reddit_url.partition('/comments/')
+        if not found:
+            return None
+        
+        # The ID is the run of ASCII letters/digits right after /comments/
+        submission_id = ''.join(takewhile(lambda char: char.isascii() and char.isalnum(), rest))
+        return submission_id or None
     
     def get_transcript(self, reddit_url: str) -> Optional[Dict]:
         """Get complete Reddit transcript from URL"""
@@ -28,36 +35,41 @@ class RedditTranscriptService:
             if not submission_id:
                 return None
             
-            # Get submission
-            submission = self.reddit.submission(id=submission_id)
+            # One listing request returns the post and its top-level comments, sorted top-first apart
+            # from stickied comments; depth=1 keeps replies out and the extra headroom covers
+            # deleted comments
+            post_listing, comment_listing = self.reddit.request(
+                method="GET",
+                path=f"comments/{submission_id}",
+                params={"limit": 50, "depth": 1, "sort": "top", "raw_json": 1}
+            )
+            post = post_listing['data']['children'][0]['data']
             
-            # Get only top-level comments (no nested replies) - top 25 by upvotes
-            submission.comments.replace_more(limit=0)  # Don't expand replies to avoid nested comments
-            top_level_comments = []
+            # Project only the needed fields of top-level comments (direct replies to the post),
+            # skipping "more" stubs
+            top_level_comments = [
+                {
+                    'id': comment['id'],
+                    'text': comment['body'],
+                    'score': comment['score'],
+                    'created_utc': comment['created_utc']
+                }
+                for comment in (child['data'] for child in comment_listing['data']['children'] if child['kind'] == 't1')
+                if comment['body'] != '[deleted]' and comment['body'] != '[removed]'
+            ]
             
-            # Collect only top-level comments (direct replies to the post)
-            for comment in submission.comments:
-                if hasattr(comment, 'body') and comment.body != '[deleted]' and comment.body != '[removed]':
-                    top_level_comments.append({
-                        'id': comment.id,
-                        'text': comment.body,
-                        'score': comment.score,
-                        'created_utc': comment.created_utc
-                    })
-            
-            # Sort by score (upvotes) in descending order and take top 25
-            top_level_comments.sort(key=lambda x: x['score'], reverse=True)
-            all_comments = top_level_comments[:25]
+            # Rank by score (upvotes) so a pinned low-score comment doesn't take a top-25 slot
+            all_comments = heapq.nlargest(25, top_level_comments, key=itemgetter('score'))
             
             # Build transcript response
             transcript = {
                 'success': True,
                 'reddit_url': reddit_url,
                 'post': {
-                    'title': submission.title,
-                    'selftext': submission.selftext if submission.selftext else '',
-                    'score': submission.score,
-                    'created_utc': submission.created_utc
+                    'title': post['title'],
+                    'selftext': post['selftext'] if post['selftext'] else '',
+                    'score': post['score'],
+                    'created_utc': post['created_utc']
                 },
                 'comments': all_comments,
                 'total_comments': len(all_comments)
@@ -1,9 +1,58 @@
-import json
+import httpx
 import os
+import orjson
+import sys
+import time
+from collections import defaultdict
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 from upstash_redis import Redis
 
+# Retry failed KV calls a few times with a short pause instead of failing the request outright
+KV_RETRIES = 3
+KV_RETRY_INTERVAL = 0.5  # seconds
+
+# Per-attempt limit on a KV call; a stalled request raises and is retried instead of hanging
+KV_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+
+# Keys fetched per SCAN round; keeps each call short instead of blocking on KEYS
+SCAN_COUNT = 1000
+
+# How long a place_id -> city lookup is reused in-process before asking KV again
+PLACE_ID_CACHE_TTL = 60  # seconds
+
+# KV layout version: place_id_index and each locations:{city}:{category} are hashes since 2.2;
+# the cities and categories:{city} sets were added in 2.3
+CACHE_VERSION = "2.3"
+
+def encode_payload(value: Any) -> str:
+    """Serialize a cache payload as compact JSON (no indentation or padding whitespace)"""
+    return orjson.dumps(value).decode()
+
+def location_field(name: str) -> str:
+    """Hash field a location is stored under in its locations:{city}:{category} hash"""
+    return name.lower()
+
+def encode_location_list(locations: List[Dict[str, Any]]) -> Dict[str, str]:
+    """Encode a legacy location list as locations hash fields, keeping the first entry per name"""
+    fields = {}
+    for position, location in enumerate(locations):
+        field = location_field(location.get("name", ""))
+        if field not in fields:
+            fields[field] = encode_payload({**location, "position": position})
+    return fields
+
+def decode_locations(fields: Dict[str, str]) -> List[Dict[str, Any]]:
+    """Decode a locations hash into a list of entries in the order they were cached"""
+    locations = [orjson.loads(value) for value in fields.values()]
+    # Entries added in one batch share cached_at; position keeps their order within the batch
+    locations.sort(key=lambda location: (location.get("cached_at") or "", location.get("position", 0)))
+    
+    # position is internal ordering data; callers get the entry as it was cached
+    for location in locations:
+        location.pop("position", None)
+    return locations
+
 class VercelKVCacheService:
     def __init__(self):
         """Initialize connection to Vercel KV using Upstash Redis"""
@@ -13,7 +62,15 @@ class VercelKVCacheService:
         if not self.kv_url or not self.kv_token:
             raise ValueError("KV_REST_API_URL and KV_REST_API_TOKEN must be set as environment variables")
         
-        self.redis = Redis(url=self.kv_url, token=self.kv_token)
+        self.redis = Redis(
+            url=self.kv_url,
+            token=self.kv_token,
+            rest_retries=KV_RETRIES,
+            rest_retry_interval=KV_RETRY_INTERVAL
+        )
+        # upstash_redis creates its httpx client with timeout=None and exposes no option for it
+        self.redis._http._client.timeout = KV_TIMEOUT
+        self._city_by_place_id = {}
         self._ensure_cache_structure()
     
     def _ensure_cache_structure(self):
@@ -24,47 +81,140 @@ class VercelKVCacheService:
             if not metadata:
                 # Initialize cache structure
                 initial_metadata = {
-                    "version": "2.0",
+                    "version": CACHE_VERSION,
                     "description": "GPT-powered location cache for verified Reddit locations with place_id support",
                     "created": datetime.now().isoformat(),
                     "format": "Redis-based KV store for MommyNature location data"
                 }
-                self.redis.set("cache_metadata", json.dumps(initial_metadata))
-                
-            # Ensure place_id_index exists
-            if not self.redis.exists("place_id_index"):
-                self.redis.set("place_id_index", json.dumps({}))
+                self.redis.set("cache_metadata", encode_payload(initial_metadata))
+            else:
+                cache_metadata = orjson.loads(metadata)
+                if cache_metadata.get("version") != CACHE_VERSION:
+                    self._upgrade_layout(cache_metadata)
                 
         except Exception as e:
             print(f"Error initializing cache structure: {e}")
     
+    def _upgrade_layout(self, cache_metadata: Dict[str, Any]):
+        """Convert keys written by older cache versions to the current layout"""
+        # place_id_index: JSON map -> hash of place_id -> city
+        if self.redis.type("place_id_index") == "string":
+            place_id_index = orjson.loads(self.redis.get("place_id_index") or "{}")
+            self._replace_with_hash("place_id_index", place_id_index)
+        
+        # locations:{city}:{category}: JSON list -> hash of location field -> JSON entry
+        categories_by_city = defaultdict(set)
+        for key in list(self._scan_keys("locations:*")):
+            if self.redis.type(key) == "string":
+                locations = orjson.loads(self.redis.get(key) or "[]")
+                self._replace_with_hash(key, encode_location_list(locations))
+                if not locations:
+                    continue
+            
+            parts = key.split(":")
+            if len(parts) >= 3:
+                categories_by_city[parts[1]].add(parts[2])
+        
+        # Index the cities and their categories found in the keyspace
+        if categories_by_city:
+            pipe = self.redis.pipeline()
+            pipe.sadd("cities", *categories_by_city)
+            for city, categories in categories_by_city.items():
+                pipe.sadd(f"categories:{city}", *categories)
+            pipe.exec()
+        
+        cache_metadata["version"] = CACHE_VERSION
+        self.redis.set("cache_metadata", encode_payload(cache_metadata))
+        print(f"✅ Upgraded KV cache layout to version {CACHE_VERSION}")
+    
+    def _replace_with_hash(self, key: str, values: Dict[str, str]):
+        """Swap a legacy string key for a hash in one transaction so a failure can't lose its data"""
+        tx = self.redis.multi()
+        tx.delete(key)
+        if values:
+            tx.hset(key, values=values)
+        tx.exec()
+    
+    def _scan_pages(self, pattern: str):
+        """Iterate over pages of keys matching pattern with SCAN, one cursor round at a time"""
+        cursor = 0
+        while True:
+            cursor, keys = self.redis.scan(cursor, match=pattern, count=SCAN_COUNT)
+            if keys:
+                yield keys
+            if int(cursor) == 0:
+                break
+    
+    def _scan_keys(self, pattern: str):
+        """Iterate over keys matching pattern with SCAN"""
+        for keys in self._scan_pages(pattern):
+            yield from keys
+    
+    def count_keys(self, pattern: str) -> int:
+        """Count distinct keys matching pattern without downloading any values"""
+        # SCAN may return a key more than once, so count distinct keys
+        return len(set(self._scan_keys(pattern)))
+    
+    def _get_city_for_place_id(self, place_id: str) -> Optional[str]:
+        """Look up a city in place_id_index, reusing a lookup younger than PLACE_ID_CACHE_TTL"""
+        entry = self._city_by_place_id.get(place_id)
+        if entry and time.time() - entry['ts'] < PLACE_ID_CACHE_TTL:
+            return entry['city']
+        
+        city = self.redis.hget("place_id_index", place_id)
+        if city:
+            self._city_by_place_id[place_id] = {'city': city, 'ts': time.time()}
+        return city
+    
+    def _pipelined(self, command: str, keys: List[str]) -> List[Any]:
+        """Run a single-key read command (get, hgetall, hlen, ...) for several keys in one round-trip"""
+        if not keys:
+            return []
+        pipe = self.redis.pipeline()
+        for key in keys:
+            getattr(pipe, command)(key)
+        return pipe.exec()
+    
     def add_locations(self, city: str, category: str, verified_locations: List[Dict[str, Any]], 
                      source_url: str = None, city_place_id: str = None, city_metadata: Dict[str, Any] = None) -> bool:
         """Add verified locations to KV cache"""
         try:
+            # Location writes go out in one pipeline; the metadata follows once the count is known
+            locations_key = f"locations:{city}:{category}"
+            pipe = self.redis.pipeline()
+            
             # Update place_id index if city_place_id is provided
             if city_place_id:
-                place_id_index = json.loads(self.redis.get("place_id_index") or "{}")
-                place_id_index[city_place_id] = city
-                self.redis.set("place_id_index", json.dumps(place_id_index))
+                pipe.hset("place_id_index", city_place_id, city)
+            
+            # Index the city and category for the summaries
+            pipe.sadd("cities", city)
+            pipe.sadd(f"categories:{city}", category)
             
             # Store city metadata
             if city_metadata:
                 city_metadata_key = f"city_metadata:{city}"
-                self.redis.set(city_metadata_key, json.dumps(city_metadata))
+                pipe.set(city_metadata_key, encode_payload(city_metadata))
             
             # Process and store locations
-            locations_key = f"locations:{city}:{category}"
-            existing_locations = json.loads(self.redis.get(locations_key) or "[]")
+            new_entries = {}
+            
+            # One timestamp for the whole batch
+            cached_at = datetime.now().isoformat()
             
             for location in verified_locations:
+                field = location_field(location["name"])
+                if field in new_entries:
+                    continue
+                
                 # Create cache entry from verified location
                 cache_entry = {
                     "name": location["name"],
                     "verified": location["verified"],
                     "city": city,
                     "category": category,
-                    "cached_at": datetime.now().isoformat(),
+                    "cached_at": cached_at,
+                    "position": len(new_entries),
                     "source_url": source_url
                 }
                 
@@ -81,20 +231,29 @@ class VercelKVCacheService:
                         "photo_urls": google_data.get("photo_urls", [])
                     })
                 
-                existing_locations.append(cache_entry)
+                new_entries[field] = encode_payload(cache_entry)
             
-            # Store updated locations
-            self.redis.set(locations_key, json.dumps(existing_locations))
+            # Store new locations as fields of the city/category hash. HSETNX keeps the entry already
+            # cached under a name (and its mama_summary), as the first-cached entry is the one lookups
+            # match, even when another request adds the same name concurrently
+            for field, value in new_entries.items():
+                pipe.hsetnx(locations_key, field, value)
+            pipe.hlen(locations_key)
+            total_locations = pipe.exec()[-1]
             
             # Update category metadata
             metadata_key = f"metadata:{city}:{category}"
             metadata = {
-                "last_updated": datetime.now().isoformat(),
+                "last_updated": cached_at,
                 "source_type": "gpt_extraction",
-                "total_locations": len(existing_locations),
+                "total_locations": total_locations,
                 "source_url": source_url
             }
-            self.redis.set(metadata_key, json.dumps(metadata))
+            self.redis.set(metadata_key, encode_payload(metadata))
+            
+            # Drop any stale in-process lookup for the city's place_id
+            if city_place_id:
+                self._city_by_place_id.pop(city_place_id, None)
             
             return True
             
@@ -108,24 +267,22 @@ class VercelKVCacheService:
             if not city and not category:
                 # Return all locations - scan all location keys
                 all_locations = []
-                keys = self.redis.keys("locations:*")
-                for key in keys:
-                    locations_data = json.loads(self.redis.get(key) or "[]")
-                    all_locations.extend(locations_data)
+                for keys in self._scan_pages("locations:*"):
+                    for fields in self._pipelined("hgetall", keys):
+                        all_locations.extend(decode_locations(fields))
                 return all_locations
             
             if city and category:
                 # Get specific city/category combination
                 locations_key = f"locations:{city}:{category}"
-                return json.loads(self.redis.get(locations_key) or "[]")
+                return decode_locations(self.redis.hgetall(locations_key))
             
             if city and not category:
                 # Get all locations for a city
                 city_locations = []
-                keys = self.redis.keys(f"locations:{city}:*")
-                for key in keys:
-                    locations_data = json.loads(self.redis.get(key) or "[]")
-                    city_locations.extend(locations_data)
+                for keys in self._scan_pages(f"locations:{city}:*"):
+                    for fields in self._pipelined("hgetall", keys):
+                        city_locations.extend(decode_locations(fields))
                 return city_locations
             
             return []
@@ -138,8 +295,7 @@ class VercelKVCacheService:
         """Get cached locations by Google place_id"""
         try:
             # Look up city from place_id index
-            place_id_index = json.loads(self.redis.get("place_id_index") or "{}")
-            city = place_id_index.get(place_id)
+            city = self._get_city_for_place_id(place_id)
             
             if not city:
                 return []
@@ -155,8 +311,7 @@ class VercelKVCacheService:
         """Get city metadata by Google place_id"""
         try:
             # Look up city from place_id index
-            place_id_index = json.loads(self.redis.get("place_id_index") or "{}")
-            city = place_id_index.get(place_id)
+            city = self._get_city_for_place_id(place_id)
             
             if not city:
                 return {}
@@ -164,7 +319,7 @@ class VercelKVCacheService:
             # Get city metadata
             city_metadata_key = f"city_metadata:{city}"
             metadata = self.redis.get(city_metadata_key)
-            return json.loads(metadata) if metadata else {}
+            return orjson.loads(metadata) if metadata else {}
             
         except Exception as e:
             print(f"Error getting city by place_id: {e}")
@@ -174,16 +329,15 @@ class VercelKVCacheService:
         """Get all cached cities with their metadata"""
         try:
             cities = []
-            keys = self.redis.keys("city_metadata:*")
-            
-            for key in keys:
-                city_name = key.replace("city_metadata:", "")
-                metadata = json.loads(self.redis.get(key) or "{}")
-                if metadata:
-                    cities.append({
-                        "city_name": city_name,
-                        **metadata
-                    })
+            for keys in self._scan_pages("city_metadata:*"):
+                for key, raw in zip(keys, self._pipelined("get", keys)):
+                    city_name = key.replace("city_metadata:", "")
+                    metadata = orjson.loads(raw or "{}")
+                    if metadata:
+                        cities.append({
+                            "city_name": city_name,
+                            **metadata
+                        })
             
             return cities
             
@@ -195,26 +349,25 @@ class VercelKVCacheService:
         """Update a location's mama summary in the cache"""
         try:
             # Look up city from place_id index
-            place_id_index = json.loads(self.redis.get("place_id_index") or "{}")
-            city = place_id_index.get(place_id)
+            city = self._get_city_for_place_id(place_id)
             
             if not city:
                 print(f"City not found for place_id: {place_id}")
                 return False
             
-            # Get existing locations
+            # Find and update the location's entry in the city/category hash
             locations_key = f"locations:{city}:{category}"
-            locations = json.loads(self.redis.get(locations_key) or "[]")
+            field = location_field(location_name)
+            raw = self.redis.hget(locations_key, field)
             
-            # Find and update the location
-            for location in locations:
-                if location.get("name", "").lower() == location_name.lower():
-                    location["mama_summary"] = mama_summary
-                    location["summary_updated"] = datetime.now().isoformat()
-                    
-                    # Save updated locations
-                    self.redis.set(locations_key, json.dumps(locations))
-                    return True
+            if raw:
+                location = orjson.loads(raw)
+                location["mama_summary"] = mama_summary
+                location["summary_updated"] = datetime.now().isoformat()
+                
+                # Save the updated entry
+                self.redis.hset(locations_key, field, encode_payload(location))
+                return True
             
             print(f"Location '{location_name}' not found in {city}/{category}")
             return False
@@ -226,48 +379,33 @@ class VercelKVCacheService:
     def get_cache_summary(self) -> Dict[str, Any]:
         """Get summary of cache contents"""
         try:
-            # Get all location keys to count cities and locations
-            location_keys = self.redis.keys("locations:*")
-            cities = set()
-            total_locations = 0
-            
-            for key in location_keys:
-                # Extract city from key: "locations:city:category"
-                parts = key.split(":")
-                if len(parts) >= 2:
-                    city = parts[1]
-                    cities.add(city)
-                    
-                    # Count locations in this key
-                    locations = json.loads(self.redis.get(key) or "[]")
-                    total_locations += len(locations)
-            
             summary = {
-                "total_cities": len(cities),
-                "total_locations": total_locations,
+                "total_cities": 0,
+                "total_locations": 0,
                 "cities": {}
             }
             
-            # Get detailed info for each city
-            for city in cities:
-                city_keys = self.redis.keys(f"locations:{city}:*")
-                categories = []
-                city_total_locations = 0
-                
-                for city_key in city_keys:
-                    # Extract category from key
-                    parts = city_key.split(":")
-                    if len(parts) >= 3:
-                        category = parts[2]
-                        categories.append(category)
-                        
-                        locations = json.loads(self.redis.get(city_key) or "[]")
-                        city_total_locations += len(locations)
-                
+            # Cities and their categories come from the index sets; counts from pipelined HLEN
+            cities = list(self.redis.smembers("cities"))
+            city_categories = [
+                list(categories)
+                for categories in self._pipelined("smembers", [f"categories:{city}" for city in cities])
+            ]
+            location_counts = iter(self._pipelined("hlen", [
+                f"locations:{city}:{category}"
+                for city, categories in zip(cities, city_categories)
+                for category in categories
+            ]))
+            
+            for city, categories in zip(cities, city_categories):
+                city_total_locations = sum(next(location_counts) for _ in categories)
                 summary["cities"][city] = {
                     "categories": categories,
                     "total_locations": city_total_locations
                 }
+                summary["total_locations"] += city_total_locations
+            
+            summary["total_cities"] = len(summary["cities"])
             
             return summary
             
@@ -278,16 +416,12 @@ class VercelKVCacheService:
     def clear_cache(self) -> bool:
         """Clear all cached data"""
         try:
-            # Delete all cache-related keys
-            keys_to_delete = []
-            keys_to_delete.extend(self.redis.keys("locations:*"))
-            keys_to_delete.extend(self.redis.keys("city_metadata:*"))
-            keys_to_delete.extend(self.redis.keys("metadata:*"))
-            keys_to_delete.append("place_id_index")
-            keys_to_delete.append("cache_metadata")
-            
-            for key in keys_to_delete:
-                self.redis.delete(key)
+            # Delete all cache-related keys, one UNLINK per SCAN page
+            for pattern in ("locations:*", "city_metadata:*", "metadata:*", "categories:*"):
+                for keys in self._scan_pages(pattern):
+                    self.redis.unlink(*keys)
+            self.redis.unlink("place_id_index", "cities", "cache_metadata")
+            self._city_by_place_id.clear()
             
             # Reinitialize cache structure
             self._ensure_cache_structure()
@@ -301,7 +435,7 @@ class VercelKVCacheService:
         """Get detailed summary of cache contents with timestamps and stats"""
         try:
             # Get cache metadata
-            cache_metadata = json.loads(self.redis.get("cache_metadata") or "{}")
+            cache_metadata = orjson.loads(self.redis.get("cache_metadata") or "{}")
             
             # Get basic summary
             basic_summary = self.get_cache_summary()
@@ -332,16 +466,21 @@ class VercelKVCacheService:
                     "categories": {}
                 }
                 
-                for category in city_info["categories"]:
+                # Fetch locations and metadata for every category of this city in one round-trip
+                categories = city_info["categories"]
+                values = []
+                if categories:
+                    pipe = self.redis.pipeline()
+                    for category in categories:
+                        pipe.hgetall(f"locations:{city}:{category}")
+                        pipe.get(f"metadata:{city}:{category}")
+                    values = pipe.exec()
+                
+                for category, fields, raw_metadata in zip(categories, values[::2], values[1::2]):
                     all_categories.add(category)
                     
-                    # Get locations for this city/category
-                    locations_key = f"locations:{city}:{category}"
-                    locations = json.loads(self.redis.get(locations_key) or "[]")
-                    
-                    # Get metadata for this city/category
-                    metadata_key = f"metadata:{city}:{category}"
-                    metadata = json.loads(self.redis.get(metadata_key) or "{}")
+                    locations = decode_locations(fields)
+                    metadata = orjson.loads(raw_metadata or "{}")
                     
                     verified_count = sum(1 for loc in locations if loc.get("verified", False))
                     total_verified += verified_count
@@ -371,7 +510,8 @@ def main():
         cache = VercelKVCacheService()
         summary = cache.get_cache_summary()
         print("Vercel KV Cache Summary:")
-        print(json.dumps(summary, indent=2))
+        sys.stdout.flush()
+        sys.stdout.buffer.write(orjson.dumps(summary, option=orjson.OPT_INDENT_2) + b"\n")
     except Exception as e:
         print(f"Error testing KV cache: {e}")
 
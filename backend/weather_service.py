@@ -1,12 +1,25 @@
-import requests
 import os
+from collections import Counter
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
+from http_session import make_session
 import json
+import orjson
+import threading
+import time
 
 load_dotenv()
 
+# Current conditions change slowly; reuse a reading for the same spot for this long
+WEATHER_CACHE_TTL = 600  # seconds
+
+# Forecasts are issued in 3-hour steps; reuse one for the same area for this long
+FORECAST_CACHE_TTL = 1800  # seconds
+
+# Upper bound on entries in each in-process cache; the oldest entries are evicted first
+CACHE_MAX_ENTRIES = 4096
+
 class WeatherService:
     def __init__(self):
         self.api_key = os.getenv('OPENWEATHER_API_KEY')
@@ -14,26 +27,51 @@ class WeatherService:
             print("Warning: OPENWEATHER_API_KEY not found in .env file")
             self.api_key = None
         self.base_url = "https://api.openweathermap.org/data/2.5"
+        self.session = make_session()
+        self._geocode_cache = {}
+        self._weather_cache = {}
+        self._forecast_cache = {}
+        self._cache_lock = threading.Lock()
+    
+    def _cache_put(self, cache: Dict, key, value, ttl: Optional[int] = None) -> None:
+        """Store a cache entry, first evicting expired entries and the oldest ones beyond CACHE_MAX_ENTRIES"""
+        with self._cache_lock:
+            cache.pop(key, None)
+            now = time.time()
+            # Dicts keep insertion order, so the oldest entries are always at the front
+            while cache:
+                oldest_key, oldest = next(iter(cache.items()))
+                if len(cache) < CACHE_MAX_ENTRIES and not (ttl and now - oldest['ts'] >= ttl):
+                    break
+                del cache[oldest_key]
+            cache[key] = value
     
     def get_coordinates_from_address(self, address: str) -> Optional[Tuple[float, float]]:
         """Get latitude and longitude from address using OpenWeatherMap Geocoding API"""
         if not self.api_key:
             return None
         
+        # Addresses don't move; reuse any coordinates already found
+        cached = self._geocode_cache.get(address)
+        if cached:
+            return cached
+        
         try:
-            geocode_url = "http://api.openweathermap.org/geo/1.0/direct"
+            geocode_url = "https://api.openweathermap.org/geo/1.0/direct"
             params = {
                 'q': address,
                 'limit': 1,
                 'appid': self.api_key
             }
             
-            response = requests.get(geocode_url, params=params)
+            response = self.session.get(geocode_url, params=params)
             
             if response.status_code == 200:
-                data = response.json()
+                data = orjson.loads(response.content)
                 if data:
-                    return (data[0]['lat'], data[0]['lon'])
+                    coords = (data[0]['lat'], data[0]['lon'])
+                    self._cache_put(self._geocode_cache, address, coords)
+                    return coords
             else:
                 print(f"Geocoding error: {response.status_code}")
                 return None
@@ -43,10 +81,15 @@ class WeatherService:
             return None
     
     def get_current_weather(self, lat: float, lon: float) -> Optional[Dict]:
-        """Get current weather for given coordinates"""
+        """Get current weather for given coordinates, reusing a reading younger than WEATHER_CACHE_TTL"""
         if not self.api_key:
             return None
         
+        cache_key = (round(lat, 3), round(lon, 3))
+        entry = self._weather_cache.get(cache_key)
+        if entry and time.time() - entry['ts'] < WEATHER_CACHE_TTL:
+            return dict(entry['data'])
+        
         try:
             params = {
                 'lat': lat,
@@ -55,11 +98,11 @@ class WeatherService:
                 'units': 'imperial'  # Fahrenheit for US users
             }
             
-            response = requests.get(f"{self.base_url}/weather", params=params)
+            response = self.session.get(f"{self.base_url}/weather", params=params)
             
             if response.status_code == 200:
-                data = response.json()
-                return {
+                data = orjson.loads(response.content)
+                weather = {
                     'temperature': round(data['main']['temp']),
                     'feels_like': round(data['main']['feels_like']),
                     'humidity': data['main']['humidity'],
@@ -69,6 +112,8 @@ class WeatherService:
                     'visibility': data.get('visibility', 0) / 1000,  # Convert to miles
                     'timestamp': datetime.now().isoformat()
                 }
+                self._cache_put(self._weather_cache, cache_key, {'data': weather, 'ts': time.time()}, WEATHER_CACHE_TTL)
+                return dict(weather)
             else:
                 print(f"Weather API error: {response.status_code}")
                 return None
@@ -78,10 +123,15 @@ class WeatherService:
             return None
     
     def get_forecast(self, lat: float, lon: float, days: int = 5) -> Optional[List[Dict]]:
-        """Get weather forecast for given coordinates (up to 5 days)"""
+        """Get weather forecast for given coordinates (up to 5 days), reusing one younger than FORECAST_CACHE_TTL"""
         if not self.api_key:
             return None
         
+        cache_key = (round(lat, 2), round(lon, 2), days)
+        entry = self._forecast_cache.get(cache_key)
+        if entry and time.time() - entry['ts'] < FORECAST_CACHE_TTL:
+            return [dict(forecast) for forecast in entry['data']]
+        
         try:
             params = {
                 'lat': lat,
@@ -90,48 +140,59 @@ class WeatherService:
                 'units': 'imperial'  # Fahrenheit for US users
             }
             
-            response = requests.get(f"{self.base_url}/forecast", params=params)
+            response = self.session.get(f"{self.base_url}/forecast", params=params)
             
             if response.status_code == 200:
-                data = response.json()
+                data = orjson.loads(response.content)
                 
-                # Group forecasts by day
+                # Fold each day's 3-hour slots into running totals instead of per-slot lists
                 daily_forecasts = {}
                 
                 for forecast in data['list'][:days*8]:  # 8 forecasts per day (every 3 hours)
                     date = datetime.fromtimestamp(forecast['dt']).date()
+                    temp = forecast['main']['temp']
                     
-                    if date not in daily_forecasts:
-                        daily_forecasts[date] = {
+                    day_data = daily_forecasts.get(date)
+                    if day_data is None:
+                        day_data = daily_forecasts[date] = {
                             'date': date.isoformat(),
-                            'temps': [],
-                            'descriptions': [],
-                            'humidity': [],
-                            'wind_speed': [],
-                            'main_conditions': []
+                            'temp_max': temp,
+                            'temp_min': temp,
+                            'temp_sum': 0,
+                            'humidity_sum': 0,
+                            'wind_speed_sum': 0,
+                            'count': 0,
+                            'descriptions': Counter(),
+                            'main_conditions': Counter()
                         }
                     
-                    daily_forecasts[date]['temps'].append(forecast['main']['temp'])
-                    daily_forecasts[date]['descriptions'].append(forecast['weather'][0]['description'])
-                    daily_forecasts[date]['humidity'].append(forecast['main']['humidity'])
-                    daily_forecasts[date]['wind_speed'].append(forecast['wind']['speed'])
-                    daily_forecasts[date]['main_conditions'].append(forecast['weather'][0]['main'])
+                    day_data['temp_max'] = max(day_data['temp_max'], temp)
+                    day_data['temp_min'] = min(day_data['temp_min'], temp)
+                    day_data['temp_sum'] += temp
+                    day_data['humidity_sum'] += forecast['main']['humidity']
+                    day_data['wind_speed_sum'] += forecast['wind']['speed']
+                    day_data['count'] += 1
+                    day_data['descriptions'][forecast['weather'][0]['description']] += 1
+                    day_data['main_conditions'][forecast['weather'][0]['main']] += 1
                 
                 # Process daily summaries
                 processed_forecasts = []
                 for date, day_data in daily_forecasts.items():
+                    count = day_data['count']
                     processed_forecasts.append({
                         'date': day_data['date'],
-                        'high_temp': round(max(day_data['temps'])),
-                        'low_temp': round(min(day_data['temps'])),
-                        'avg_temp': round(sum(day_data['temps']) / len(day_data['temps'])),
-                        'description': max(set(day_data['descriptions']), key=day_data['descriptions'].count),
-                        'main': max(set(day_data['main_conditions']), key=day_data['main_conditions'].count),
-                        'avg_humidity': round(sum(day_data['humidity']) / len(day_data['humidity'])),
-                        'avg_wind_speed': round(sum(day_data['wind_speed']) / len(day_data['wind_speed']), 1)
+                        'high_temp': round(day_data['temp_max']),
+                        'low_temp': round(day_data['temp_min']),
+                        'avg_temp': round(day_data['temp_sum'] / count),
+                        'description': day_data['descriptions'].most_common(1)[0][0],
+                        'main': day_data['main_conditions'].most_common(1)[0][0],
+                        'avg_humidity': round(day_data['humidity_sum'] / count),
+                        'avg_wind_speed': round(day_data['wind_speed_sum'] / count, 1)
                     })
                 
-                return processed_forecasts[:days]
+                processed_forecasts = processed_forecasts[:days]
+                self._cache_put(self._forecast_cache, cache_key, {'data': processed_forecasts, 'ts': time.time()}, FORECAST_CACHE_TTL)
+                return [dict(forecast) for forecast in processed_forecasts]
             else:
                 print(f"Forecast API error: {response.status_code}")
                 return None